@@ -1,12 +1,49 @@
-import uuid
+import json
+import logging
+import re
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import requests
 from requests import RequestException
+from requests.adapters import HTTPAdapter
 
 from elastalert.alerts import Alerter
 from elastalert.util import EAException, elastalert_logger, lookup_es_key
 
+# Matches the {0[field.name]} placeholders used in alert_subject-style templates
+_FIELD_RE = re.compile(r'\{0\[([^\]]+)\]\}')
+
+# Upper bound on concurrent IOC uploads; the session pool is sized to match
+_IOC_UPLOAD_WORKERS = 8
+
+# (epoch second, formatted timestamp) pair shared by alerts fired within one second
+_ts_cache = (0, "")
+
+# Serialize request bodies with orjson when available; the session already sends
+# a Content-Type: application/json header, so the server sees no difference.
+try:
+    import orjson
+
+    def _json_dumps(payload):
+        return orjson.dumps(payload)
+except ImportError:
+    def _json_dumps(payload):
+        return json.dumps(payload).encode('utf-8')
+
+
+def _cached_lookup(match, field_name, cache):
+    """lookup_es_key with a per-alert memo, so repeated lookups of the same
+    dotted field against one match only traverse the dict once."""
+    try:
+        return cache[field_name]
+    except KeyError:
+        value = lookup_es_key(match, field_name)
+        cache[field_name] = value
+        return value
+
 
 class IrisAlerter(Alerter):
     required_options = set(['iris_host', 'iris_api_token'])
@@ -35,7 +72,78 @@ class IrisAlerter(Alerter):
         self.alert_context = self.rule.get('iris_alert_context', None)
         self.iocs = self.rule.get('iris_iocs', None)
 
-    def lookup_field(self, match: dict, field_name: str, default):
+        # The template strings never change after rule load, so parse them once
+        # here and only substitute match values at alert time.
+        self._description_tmpl = self._compile_template(self.description)
+        self._alert_note_tmpl = self._compile_template(self.alert_note)
+        self._alert_tags_tmpl = self._compile_template(self.alert_tags)
+
+        # When alert_subject carries {0[...]} placeholders that create_title would
+        # leave untouched, compile it too so the title renders in a single pass.
+        alert_subject = self.rule.get('alert_subject')
+        if (isinstance(alert_subject, str) and '{0[' in alert_subject
+                and 'alert_subject_args' not in self.rule
+                and self.rule.get('alert_text_type') != 'alert_text_jinja'):
+            alert_subject_max_len = int(self.rule.get('alert_subject_max_len', 2048))
+            self._title_tmpl = self._compile_template(alert_subject[:alert_subject_max_len])
+        else:
+            self._title_tmpl = None
+
+        # The IOC records are likewise fixed at rule load; freeze each one as a
+        # template so the per-alert loop only has to resolve the ioc_value field.
+        if self.iocs:
+            # ioc_value is optional in the schema; a record without it can never
+            # resolve a value from the match, so it is dropped from the plan here.
+            self._ioc_plan = [
+                (tuple(record.items()), record['ioc_value'])
+                for record in self.iocs
+                if record.get('ioc_value') is not None
+            ]
+        else:
+            self._ioc_plan = []
+
+        # Constant payload fragments, bound once so the builders just spread them
+        self._alert_base = {
+            "alert_source": self.alert_source,
+            "alert_severity_id": self.alert_severity_id,
+            "alert_status_id": self.alert_status_id,
+            "alert_customer_id": self.customer_id,
+        }
+        self._case_base = {
+            "case_customer": self.customer_id,
+            "case_name": self.rule.get('name'),
+            "case_description": self.description,
+        }
+
+        # Freeze the alert_context mapping, resolving each rule-level fallback once
+        if self.alert_context:
+            self._ctx_plan = tuple(
+                (key, field_name, self.rule.get(field_name, ''))
+                for key, field_name in self.alert_context.items()
+            )
+        else:
+            self._ctx_plan = ()
+
+        if self.ignore_ssl_errors:
+            requests.packages.urllib3.disable_warnings()
+
+        # Reuse a single session so consecutive requests (the case plus each IOC)
+        # share a pooled connection instead of opening a new TLS connection each time.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.verify = self.ca_cert if self.ca_cert else not self.ignore_ssl_errors
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=_IOC_UPLOAD_WORKERS))
+
+        # iris_type is fixed per rule, so bind the dispatch target once rather
+        # than re-checking the string on every alert.
+        if 'alert' in self.type:
+            self._send = self._send_alert
+        elif 'case' in self.type:
+            self._send = self._send_case
+        else:
+            self._send = None
+
+    def lookup_field(self, match: dict, field_name: str, default, cache=None):
         """Populates a field with values depending on the contents of the Elastalert match
         provided to it.
 
@@ -43,124 +151,196 @@ class IrisAlerter(Alerter):
         First checks any fields found in the match provided, then any fields defined in
         the rule, finally returning the default value provided if no value can be found.
         """
-        field_value = lookup_es_key(match, field_name)
+        if cache is None:
+            cache = {}
+        field_value = _cached_lookup(match, field_name, cache)
         if field_value is None:
             field_value = self.rule.get(field_name, default)
 
         return field_value
 
-    def format_string_with_match(self, template_string, matches):
+    @staticmethod
+    def _compile_template(template_string):
+        """Parse a template string into a list of (literal_text, field_name) segments.
+
+        Literal segments carry a None field name, placeholder segments a None
+        literal. Returns None when no template is configured.
+        """
+        if template_string is None:
+            return None
+
+        template_string = str(template_string)
+        segments = []
+        pos = 0
+        for placeholder in _FIELD_RE.finditer(template_string):
+            if placeholder.start() > pos:
+                segments.append((template_string[pos:placeholder.start()], None))
+            segments.append((None, placeholder.group(1)))
+            pos = placeholder.end()
+        if pos < len(template_string):
+            segments.append((template_string[pos:], None))
+
+        # The parser emits maximal literal runs, so literal segments are never
+        # adjacent and the render fast paths below can rely on segment count.
+        return segments
+
+    @staticmethod
+    def _render_field(field_name, field_value):
+        if field_value is None:
+            return f"<MISSING: {field_name}>"
+        if isinstance(field_value, list):
+            return ", ".join([str(item) for item in field_value])
+        return str(field_value)
+
+    def _render(self, segments, match, cache=None):
+        """Render a template compiled by `_compile_template` against a match."""
+        if segments is None:
+            return None
+
+        if cache is None:
+            cache = {}
+
+        # Fast paths for the dominant template shapes: pure literal, and a
+        # single placeholder with at most one literal on either side.
+        if len(segments) == 1:
+            literal, field_name = segments[0]
+            if field_name is None:
+                return literal
+            return self._render_field(field_name, _cached_lookup(match, field_name, cache))
+        if len(segments) == 2:
+            (first_literal, first_field), (second_literal, second_field) = segments
+            if first_field is None and second_field is not None:
+                return first_literal + self._render_field(second_field, _cached_lookup(match, second_field, cache))
+            if first_field is not None and second_field is None:
+                return self._render_field(first_field, _cached_lookup(match, first_field, cache)) + second_literal
+        elif len(segments) == 3 and segments[0][1] is None and segments[2][1] is None:
+            field_name = segments[1][1]
+            return segments[0][0] + self._render_field(field_name, _cached_lookup(match, field_name, cache)) + segments[2][0]
+
+        pieces = []
+        for literal, field_name in segments:
+            if field_name is None:
+                pieces.append(literal)
+            else:
+                pieces.append(self._render_field(field_name, _cached_lookup(match, field_name, cache)))
+
+        return "".join(pieces)
+
+    def format_string_with_match(self, template_string, matches, cache=None):
         """Format a template string with match data using the same logic as alert_subject"""
         if template_string is None:
             return None
-            
+
+        # Plain strings without placeholders don't need the regex pass at all
+        if isinstance(template_string, str) and '{0[' not in template_string:
+            return template_string
+
         # Handle {0[field.name]} format used in alert_subject
-        import re
-        pattern = r'\{0\[([^\]]+)\]\}'
-        
+        _lookup = _cached_lookup
+        _match = matches[0]
+        _cache = cache if cache is not None else {}
+
         def replace_field(match):
             field_name = match.group(1)
-            field_value = lookup_es_key(matches[0], field_name)
+            field_value = _lookup(_match, field_name, _cache)
             if field_value is not None:
                 # If it's a list/array, join with commas
                 if isinstance(field_value, list):
-                    return ", ".join(str(item) for item in field_value)
+                    return ", ".join([str(item) for item in field_value])
                 return str(field_value)
             return f"<MISSING: {field_name}>"
         
-        return re.sub(pattern, replace_field, str(template_string))
+        return _FIELD_RE.sub(replace_field, str(template_string))
 
-    def make_alert_context_records(self, matches):
+    def make_alert_context_records(self, matches, cache=None):
         alert_context = {}
 
-        for key, value in self.alert_context.items():
-            data = str(self.lookup_field(matches[0], value, ''))
-            alert_context.update(
-                {
-                    key: data
-                }
-            )
+        if cache is None:
+            cache = {}
+        match = matches[0]
+        for key, field_name, default in self._ctx_plan:
+            value = _cached_lookup(match, field_name, cache)
+            if value is None:
+                value = default
+            alert_context[key] = value if type(value) is str else str(value)
 
         return alert_context
 
-    def make_iocs_records(self, matches):
+    def make_iocs_records(self, matches, cache=None):
         iocs = []
-        for record in self.iocs:
-            # Duplicating match record data so we can update the ioc_value without overwriting record
-            record_data = record.copy()
-            record_data['ioc_value'] = lookup_es_key(matches[0], record['ioc_value'])
-            if record_data['ioc_value'] is not None:
-                iocs.append(record_data)
+        if cache is None:
+            cache = {}
+        for record_template, value_field in self._ioc_plan:
+            ioc_value = _cached_lookup(matches[0], value_field, cache)
+            if ioc_value is not None:
+                # Building a fresh dict per alert so the configured record is never mutated
+                ioc = dict(record_template)
+                ioc['ioc_value'] = ioc_value
+                iocs.append(ioc)
         return iocs
 
     def make_alert(self, matches):
+        global _ts_cache
+
         if self.overwrite_timestamp:
             event_timestamp = matches[0].get('@timestamp')
         else:
-            event_timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+            # The format only has second granularity, so alerts fired within the
+            # same second can reuse one formatted timestamp. Rules alert from
+            # multiple scheduler threads, so publish the pair with a single
+            # tuple rebind rather than two element writes.
+            now = int(time.time())
+            cached_second, event_timestamp = _ts_cache
+            if cached_second != now:
+                event_timestamp = datetime.fromtimestamp(now).strftime("%Y-%m-%dT%H:%M:%S")
+                _ts_cache = (now, event_timestamp)
         
+        # One lookup memo shared by every template and record built for this alert
+        cache = {}
+
         # Process custom fields with match data formatting
-        formatted_description = self.format_string_with_match(self.description, matches)
-        formatted_alert_note = self.format_string_with_match(self.alert_note, matches)
-        formatted_alert_tags = self.format_string_with_match(self.alert_tags, matches)
-        
-        # Debug: Log the formatted tags
-        elastalert_logger.info(f"IRIS Alert Tags: {formatted_alert_tags}")
-        
-        # Get the formatted title - apply our custom formatting directly
-        alert_title = self.create_title(matches)
-        # If the title still contains the template, format it manually
-        if "{0[" in str(alert_title):
-            alert_title = self.format_string_with_match(alert_title, matches)
+        formatted_description = self._render(self._description_tmpl, matches[0], cache)
+        formatted_alert_note = self._render(self._alert_note_tmpl, matches[0], cache)
+        formatted_alert_tags = self._render(self._alert_tags_tmpl, matches[0], cache)
+
+        if elastalert_logger.isEnabledFor(logging.DEBUG):
+            elastalert_logger.debug("IRIS Alert Tags: %s", formatted_alert_tags)
+
+        # Get the formatted title - render the precompiled subject template when
+        # one exists, otherwise fall back to create_title
+        if self._title_tmpl is not None:
+            alert_title = self._render(self._title_tmpl, matches[0], cache)
+        else:
+            alert_title = self.create_title(matches)
+            # If the title still contains the template, format it manually
+            if "{0[" in str(alert_title):
+                alert_title = self.format_string_with_match(alert_title, matches, cache)
         
-        alert_data = {
+        # If there is an existing description it is used as-is, otherwise fall back to the create_alert_body data.
+        description = formatted_description if self.description else self.create_alert_body(matches)
+        iocs = self.make_iocs_records(matches, cache) if self.iocs else None
+        alert_context = self.make_alert_context_records(matches, cache) if self.alert_context else None
+
+        return {
             "alert_title": alert_title,
-            "alert_description": formatted_description,
-            "alert_source": self.alert_source,
-            "alert_severity_id": self.alert_severity_id,
-            "alert_status_id": self.alert_status_id,
+            "alert_description": description,
+            **self._alert_base,
             "alert_source_event_time": event_timestamp,
             "alert_note": formatted_alert_note,
             "alert_tags": formatted_alert_tags,
-            "alert_customer_id": self.customer_id,
+            **({"alert_source_link": self.alert_source_link} if self.alert_source_link else {}),
+            **({"alert_iocs": iocs} if iocs is not None else {}),
+            **({"alert_context": alert_context} if alert_context is not None else {}),
         }
 
-        # If there is an existing description, it will populate in alert_data otherwise update the alert_data with the create_alert_body data.
-        if not self.description:
-            alert_data.update(
-                {"alert_description": self.create_alert_body(matches)}
-            )
-
-        if self.alert_source_link:
-            alert_data.update(
-                {"alert_source_link": self.alert_source_link}
-            )
-
-        if self.iocs:
-            iocs = self.make_iocs_records(matches)
-            alert_data.update(
-                {"alert_iocs": iocs}
-            )
-
-        if self.alert_context:
-            alert_context = self.make_alert_context_records(matches)
-            alert_data.update(
-                {"alert_context": alert_context}
-            )
-
-        return alert_data
-
     def make_case(self, matches):
-        iocs = []
         case_data = {
-            "case_soc_id": f"SOC_{str(uuid.uuid4())[0:6]}",
-            "case_customer": self.customer_id,
-            "case_name": self.rule.get('name'),
-            "case_description": self.description
+            "case_soc_id": f"SOC_{secrets.token_hex(3)}",
+            **self._case_base,
         }
 
-        if self.iocs:
-            iocs = self.make_iocs_records(matches)
+        # Empty tuple sentinel avoids allocating a list when no IOCs are configured
+        iocs = self.make_iocs_records(matches) if self.iocs else ()
 
         if self.case_template_id:
             case_data.update(
@@ -170,75 +350,67 @@ class IrisAlerter(Alerter):
         return case_data, iocs
     
     def alert(self, matches):
-        if self.ca_cert:
-            verify = self.ca_cert
-        else:
-            verify = not self.ignore_ssl_errors
-
-        if self.ignore_ssl_errors:
-            requests.packages.urllib3.disable_warnings()
+        if self._send is not None:
+            self._send(matches)
 
-        if 'alert' in self.type:
-            alert_data = self.make_alert(matches)
+    def _send_alert(self, matches):
+        alert_data = self.make_alert(matches)
 
-            try:
-                alert_response = requests.post(
-                    url=f'{self.url}/alerts/add',
-                    headers=self.headers,
-                    json=alert_data,
-                    verify=verify,
-                )
+        try:
+            alert_response = self.session.post(
+                url=f'{self.url}/alerts/add',
+                data=_json_dumps(alert_data),
+            )
 
-                if alert_response.status_code != 200:
-                    raise EAException(f"Cannot create a new alert: {alert_response.status_code}")
+            if alert_response.status_code != 200:
+                raise EAException(f"Cannot create a new alert: {alert_response.status_code}")
 
-            except RequestException as e:
-                raise EAException(f"Error posting alert to Iris: {e}")
-            elastalert_logger.info('Alert sent to Iris')
+        except RequestException as e:
+            raise EAException(f"Error posting alert to Iris: {e}")
+        elastalert_logger.info('Alert sent to Iris')
 
-        elif 'case' in self.type:
-            case_data, iocs = self.make_case(matches)
-
-            try:
-                case_response = requests.post(
-                    url=f'{self.url}/manage/cases/add',
-                    headers=self.headers,
-                    json=case_data,
-                    verify=verify,
-                )
+    def _send_case(self, matches):
+        case_data, iocs = self.make_case(matches)
 
+        try:
+            case_response = self.session.post(
+                url=f'{self.url}/manage/cases/add',
+                data=_json_dumps(case_data),
+            )
 
-                if case_response.status_code == 200:
+            if case_response.status_code == 200:
+                if iocs:
+                    # The case id is only needed to attach IOCs, so skip parsing
+                    # the response body entirely when none are configured. The
+                    # `or {}` keeps a missing 'data' key from raising on .get().
                     case_response_data = case_response.json()
-                    case_id = case_response_data.get('data', '').get('case_id')
+                    case_id = (case_response_data.get('data') or {}).get('case_id')
                     for ioc in iocs:
-                        ioc.update(
-                            {
-                                "cid": case_id
-                            }
-                        )
-
-                        try:
-                            response_ioc = requests.post(
-                                url=f'{self.url}/case/ioc/add',
-                                headers=self.headers,
-                                json=ioc,
-                                verify=verify,
-                            )
-
-                            if response_ioc.status_code != 200:
-                                raise EAException(f"Unable to add a new IOC to the case {case_id}")
-
-                        except RequestException as e:
-                            raise EAException(f"Error when adding IOC to the case {case_id}: {e}")
-                        elastalert_logger.info('IOCs successfully added to the case')
-
-                else:
-                    raise EAException(f'Cannot create a new case: {case_response.status_code}')
-
-            except RequestException as e:
-                raise EAException(f"Error posting the case to Iris: {e}")
-            elastalert_logger.info('Case successfully created in Iris')
+                        ioc['cid'] = case_id
+
+                    # The IOC uploads are independent, so dispatch them
+                    # concurrently over the pooled session connections.
+                    ioc_url = f'{self.url}/case/ioc/add'
+                    try:
+                        with ThreadPoolExecutor(max_workers=min(_IOC_UPLOAD_WORKERS, len(iocs))) as executor:
+                            ioc_responses = list(executor.map(
+                                lambda ioc: self.session.post(url=ioc_url, data=_json_dumps(ioc)),
+                                iocs,
+                            ))
+                    except RequestException as e:
+                        raise EAException(f"Error when adding IOC to the case {case_id}: {e}")
+
+                    for response_ioc in ioc_responses:
+                        if response_ioc.status_code != 200:
+                            raise EAException(f"Unable to add a new IOC to the case {case_id}")
+                    elastalert_logger.info('IOCs successfully added to the case')
+
+            else:
+                raise EAException(f'Cannot create a new case: {case_response.status_code}')
+
+        except RequestException as e:
+            raise EAException(f"Error posting the case to Iris: {e}")
+        elastalert_logger.info('Case successfully created in Iris')
 
     def get_info(self):
         return {
@@ -1,4 +1,6 @@
+import json
 import logging
+import pytest
 
 from unittest import mock
 from unittest.mock import patch
@@ -6,6 +8,7 @@ from datetime import datetime
 
 from elastalert.alerters.iris import IrisAlerter
 from elastalert.loaders import FileRulesLoader
+from elastalert.util import EAException
 
 
 def test_iris_make_alert_context_records(caplog):
@@ -817,6 +820,130 @@ def test_iris_make_alert_maximal_with_nested_json(caplog):
     assert expected_data == actual_data
 
 
+def test_iris_make_alert_templated_fields(caplog):
+    caplog.set_level(logging.INFO)
+    rule = {
+        'name': 'Test Templated Fields',
+        'type': 'any',
+        'iris_host': '127.0.0.1',
+        'iris_api_token': 'token 12345',
+        'iris_customer_id': 1,
+        'iris_description': 'User {0[username]} from {0[host.src_ip]} ({0[missing_field]})',
+        'iris_alert_note': '',
+        'iris_alert_tags': 'labels: {0[labels]}',
+        'alert': [],
+    }
+
+    rules_loader = FileRulesLoader({})
+    rules_loader.load_modules(rule)
+    alert = IrisAlerter(rule)
+
+    match = {
+        '@timestamp': '2023-10-21 20:00:00.000', 'username': 'evil_user', 'host': {'src_ip': '172.20.1.1'},
+        'labels': ['suspicious', 'vpn', 8]
+    }
+
+    actual_data = alert.make_alert([match])
+
+    assert actual_data['alert_description'] == 'User evil_user from 172.20.1.1 (<MISSING: missing_field>)'
+    assert actual_data['alert_note'] == ''
+    assert actual_data['alert_tags'] == 'labels: suspicious, vpn, 8'
+
+
+@pytest.mark.parametrize('description, expected_description', [
+    # literal-only template
+    ('plain text', 'plain text'),
+    # single placeholder
+    ('{0[username]}', 'evil_user'),
+    # literal + placeholder
+    ('user: {0[username]}', 'user: evil_user'),
+    # placeholder + literal
+    ('{0[username]} detected', 'evil_user detected'),
+    # literal + placeholder + literal
+    ('user {0[username]} detected', 'user evil_user detected'),
+    # adjacent placeholders hit the generic join loop
+    ('{0[username]}{0[src_ip]}', 'evil_user172.20.1.1'),
+    # several placeholders including a missing field
+    ('a {0[username]} b {0[src_ip]} c {0[nope]}', 'a evil_user b 172.20.1.1 c <MISSING: nope>'),
+    # falsy values must still render, not fall back to defaults
+    ('count={0[count]} flag={0[flag]}', 'count=0 flag=False'),
+])
+def test_iris_make_alert_description_template_shapes(description, expected_description):
+    rule = {
+        'name': 'Test Template Shapes',
+        'type': 'any',
+        'iris_host': '127.0.0.1',
+        'iris_api_token': 'token 12345',
+        'iris_customer_id': 1,
+        'iris_description': description,
+        'alert': [],
+    }
+
+    rules_loader = FileRulesLoader({})
+    rules_loader.load_modules(rule)
+    alert = IrisAlerter(rule)
+
+    match = {
+        '@timestamp': '2023-10-21 20:00:00.000', 'username': 'evil_user', 'src_ip': '172.20.1.1',
+        'count': 0, 'flag': False
+    }
+
+    actual_data = alert.make_alert([match])
+    assert actual_data['alert_description'] == expected_description
+
+
+def test_iris_make_alert_subject_template(caplog):
+    caplog.set_level(logging.INFO)
+    rule = {
+        'name': 'Test Subject Template',
+        'alert_subject': 'Login by {0[username]} from {0[src_ip]}',
+        'type': 'any',
+        'iris_host': '127.0.0.1',
+        'iris_api_token': 'token 12345',
+        'iris_customer_id': 1,
+        'alert': [],
+    }
+
+    rules_loader = FileRulesLoader({})
+    rules_loader.load_modules(rule)
+    alert = IrisAlerter(rule)
+
+    match = {
+        '@timestamp': '2023-10-21 20:00:00.000', 'username': 'evil_user', 'src_ip': '172.20.1.1'
+    }
+
+    actual_data = alert.make_alert([match])
+    assert actual_data['alert_title'] == 'Login by evil_user from 172.20.1.1'
+
+
+def test_iris_make_alert_subject_template_truncation(caplog):
+    """alert_subject_max_len truncates the raw subject before placeholder
+    substitution, so a placeholder cut in half stays verbatim - the same
+    behaviour as create_custom_title followed by the formatting pass."""
+    caplog.set_level(logging.INFO)
+    rule = {
+        'name': 'Test Subject Truncation',
+        'alert_subject': 'User {0[username]} logged in',
+        'alert_subject_max_len': 10,
+        'type': 'any',
+        'iris_host': '127.0.0.1',
+        'iris_api_token': 'token 12345',
+        'iris_customer_id': 1,
+        'alert': [],
+    }
+
+    rules_loader = FileRulesLoader({})
+    rules_loader.load_modules(rule)
+    alert = IrisAlerter(rule)
+
+    match = {
+        '@timestamp': '2023-10-21 20:00:00.000', 'username': 'evil_user'
+    }
+
+    actual_data = alert.make_alert([match])
+    assert actual_data['alert_title'] == 'User {0[us'
+
+
 def test_iris_make_case_minimal(caplog):
     caplog.set_level(logging.INFO)
     rule = {
@@ -845,7 +972,7 @@ def test_iris_make_case_minimal(caplog):
         "case_description": None
     }
 
-    with patch('uuid.uuid4', return_value='123456'):
+    with patch('secrets.token_hex', return_value='123456'):
         actual_data, actual_data_iocs = alert.make_case([match])
 
     assert expected_data == actual_data
@@ -914,7 +1041,7 @@ def test_iris_make_case_maximal(caplog):
         }
     ]
 
-    with patch('uuid.uuid4', return_value='123456'):
+    with patch('secrets.token_hex', return_value='123456'):
         actual_data, actual_data_iocs = alert.make_case([match])
 
     assert expected_data == actual_data
@@ -997,20 +1124,19 @@ def test_iris_alert_alert(caplog):
     }
     mock_response = mock.Mock()
     mock_response.status_code = 200
-    with mock.patch('requests.post', return_value=mock_response) as mock_post_request:
+    with mock.patch.object(alert.session, 'post', return_value=mock_response) as mock_post_request:
         alert.alert([match])
 
     mock_post_request.assert_called_once_with(
         url=f'https://{rule["iris_host"]}/alerts/add',
-        headers={
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {rule["iris_api_token"]}'
-        },
-        json=mock.ANY,
-        verify=True,
+        data=mock.ANY,
     )
 
-    assert expected_data == mock_post_request.call_args_list[0][1]['json']
+    assert alert.session.headers['Content-Type'] == 'application/json'
+    assert alert.session.headers['Authorization'] == f'Bearer {rule["iris_api_token"]}'
+    assert alert.session.verify is True
+
+    assert expected_data == json.loads(mock_post_request.call_args_list[0][1]['data'])
     assert ('elastalert', logging.INFO, 'Alert sent to Iris') == caplog.record_tuples[0]
 
 
@@ -1091,23 +1217,186 @@ def test_iris_alert_alert_with_custom_customer_id(caplog):
     }
     mock_response = mock.Mock()
     mock_response.status_code = 200
-    with mock.patch('requests.post', return_value=mock_response) as mock_post_request:
+    with mock.patch.object(alert.session, 'post', return_value=mock_response) as mock_post_request:
         alert.alert([match])
 
     mock_post_request.assert_called_once_with(
         url=f'https://{rule["iris_host"]}/alerts/add',
-        headers={
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {rule["iris_api_token"]}'
-        },
-        json=mock.ANY,
-        verify=True,
+        data=mock.ANY,
     )
 
-    assert expected_data == mock_post_request.call_args_list[0][1]['json']
+    assert alert.session.headers['Content-Type'] == 'application/json'
+    assert alert.session.headers['Authorization'] == f'Bearer {rule["iris_api_token"]}'
+    assert alert.session.verify is True
+
+    assert expected_data == json.loads(mock_post_request.call_args_list[0][1]['data'])
     assert ('elastalert', logging.INFO, 'Alert sent to Iris') == caplog.record_tuples[0]
 
 
+def test_iris_alert_case(caplog):
+    caplog.set_level(logging.INFO)
+    rule = {
+        'name': 'Test Case',
+        'type': 'any',
+        'iris_type': 'case',
+        'iris_host': '127.0.0.1',
+        'iris_api_token': 'token 12345',
+        'iris_customer_id': 1,
+        'iris_iocs': [
+            {
+                'ioc_description': 'source address',
+                'ioc_tags': 'ip, ipv4',
+                'ioc_tlp_id': 1,
+                'ioc_type_id': 76,
+                'ioc_value': 'src_ip'
+            },
+            {
+                'ioc_description': 'target username',
+                'ioc_tags': 'login, username',
+                'ioc_tlp_id': 3,
+                'ioc_type_id': 3,
+                'ioc_value': 'username'
+            }
+        ],
+        'alert': [],
+    }
+
+    rules_loader = FileRulesLoader({})
+    rules_loader.load_modules(rule)
+    alert = IrisAlerter(rule)
+
+    match = {
+        '@timestamp': '2023-10-21 20:00:00.000', 'username': 'evil_user', 'src_ip': '172.20.1.1', 'dst_ip': '10.0.0.1',
+        'event_type': 'login', 'event_status': 'success'
+    }
+
+    expected_iocs = [
+        {
+            'ioc_description': 'source address',
+            'ioc_tags': 'ip, ipv4',
+            'ioc_tlp_id': 1,
+            'ioc_type_id': 76,
+            'ioc_value': '172.20.1.1',
+            'cid': 42
+        },
+        {
+            'ioc_description': 'target username',
+            'ioc_tags': 'login, username',
+            'ioc_tlp_id': 3,
+            'ioc_type_id': 3,
+            'ioc_value': 'evil_user',
+            'cid': 42
+        }
+    ]
+
+    mock_response = mock.Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {'data': {'case_id': 42}}
+    with mock.patch.object(alert.session, 'post', return_value=mock_response) as mock_post_request:
+        alert.alert([match])
+
+    assert mock_post_request.call_count == 3
+    assert mock_post_request.call_args_list[0][1]['url'] == f'https://{rule["iris_host"]}/manage/cases/add'
+
+    actual_iocs = []
+    for ioc_call in mock_post_request.call_args_list[1:]:
+        assert ioc_call[1]['url'] == f'https://{rule["iris_host"]}/case/ioc/add'
+        actual_iocs.append(json.loads(ioc_call[1]['data']))
+    assert expected_iocs == actual_iocs
+
+    assert ('elastalert', logging.INFO, 'IOCs successfully added to the case') in caplog.record_tuples
+    assert ('elastalert', logging.INFO, 'Case successfully created in Iris') in caplog.record_tuples
+
+
+def test_iris_alert_case_without_response_data(caplog):
+    caplog.set_level(logging.INFO)
+    rule = {
+        'name': 'Test Case',
+        'type': 'any',
+        'iris_type': 'case',
+        'iris_host': '127.0.0.1',
+        'iris_api_token': 'token 12345',
+        'iris_customer_id': 1,
+        'iris_iocs': [
+            {
+                'ioc_description': 'source address',
+                'ioc_tags': 'ip, ipv4',
+                'ioc_tlp_id': 1,
+                'ioc_type_id': 76,
+                'ioc_value': 'src_ip'
+            }
+        ],
+        'alert': [],
+    }
+
+    rules_loader = FileRulesLoader({})
+    rules_loader.load_modules(rule)
+    alert = IrisAlerter(rule)
+
+    match = {
+        '@timestamp': '2023-10-21 20:00:00.000', 'username': 'evil_user', 'src_ip': '172.20.1.1', 'dst_ip': '10.0.0.1',
+        'event_type': 'login', 'event_status': 'success'
+    }
+
+    # A response body without the 'data' key must not raise
+    mock_response = mock.Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {}
+    with mock.patch.object(alert.session, 'post', return_value=mock_response) as mock_post_request:
+        alert.alert([match])
+
+    assert mock_post_request.call_count == 2
+    assert json.loads(mock_post_request.call_args_list[1][1]['data'])['cid'] is None
+    assert ('elastalert', logging.INFO, 'Case successfully created in Iris') in caplog.record_tuples
+
+
+def test_iris_alert_case_ioc_error(caplog):
+    caplog.set_level(logging.INFO)
+    rule = {
+        'name': 'Test Case',
+        'type': 'any',
+        'iris_type': 'case',
+        'iris_host': '127.0.0.1',
+        'iris_api_token': 'token 12345',
+        'iris_customer_id': 1,
+        'iris_iocs': [
+            {
+                'ioc_description': 'source address',
+                'ioc_tags': 'ip, ipv4',
+                'ioc_tlp_id': 1,
+                'ioc_type_id': 76,
+                'ioc_value': 'src_ip'
+            }
+        ],
+        'alert': [],
+    }
+
+    rules_loader = FileRulesLoader({})
+    rules_loader.load_modules(rule)
+    alert = IrisAlerter(rule)
+
+    match = {
+        '@timestamp': '2023-10-21 20:00:00.000', 'username': 'evil_user', 'src_ip': '172.20.1.1', 'dst_ip': '10.0.0.1',
+        'event_type': 'login', 'event_status': 'success'
+    }
+
+    case_response = mock.Mock()
+    case_response.status_code = 200
+    case_response.json.return_value = {'data': {'case_id': 42}}
+    ioc_response = mock.Mock()
+    ioc_response.status_code = 400
+
+    def post(url, data=None):
+        if url.endswith('/manage/cases/add'):
+            return case_response
+        return ioc_response
+
+    with pytest.raises(EAException) as ea:
+        with mock.patch.object(alert.session, 'post', side_effect=post):
+            alert.alert([match])
+    assert 'Unable to add a new IOC to the case 42' in str(ea)
+
+
 def test_iris_get_info(caplog):
     caplog.set_level(logging.INFO)
     rule = {